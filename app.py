@@ -1,16 +1,47 @@
-import streamlit as st
-import pandas as pd
 import time
+_RUN_START = time.perf_counter()
+
+import sys
+import logging
+import json
+import math
+import threading
+import uuid
 import urllib.parse
+from collections import OrderedDict
 from datetime import datetime, timedelta
-import gspread
-from google.oauth2.service_account import Credentials
+import streamlit as st
+
+# pandas, gspread und google-auth werden erst nach dem ersten Paint importiert
+# (pandas in MAIN APP vor dem ersten Daten-Zugriff, gspread in get_google_sheet_client),
+# damit Titel & Platzhalter sofort erscheinen. Funktionen mit `pd` erst danach aufrufen.
+_COLD_START = "pandas" not in sys.modules
+
+logger = logging.getLogger("fitness_derby")
+if not logger.handlers:
+    # Das Skript läuft bei jedem Rerun neu -> Handler nur einmal pro Prozess anhängen
+    _log_handler = logging.StreamHandler()
+    _log_handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s: %(message)s"))
+    logger.addHandler(_log_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
 
 # --- KONFIGURATION ---
 GOAL = 10000
 SHEET_ID = "1EYEj7wC8Rdo2gCDP4__PQwknmvX75Y9PRkoDKqA8AUM"
 EXERCISES = ["Pushups", "Pullups", "Dips"]
 
+# 🛡️ SCHREIB-SCHUTZ
+DUPLICATE_WINDOW_SECONDS = 10   # gleiche Eingabe + Token so kurz danach = Doppel-Klick / erneutes Senden
+OUTLIER_WINDOW = 20             # letzte N Einträge je Spieler & Übung
+OUTLIER_MIN_SAMPLES = 5         # erst ab so vielen Einträgen wird geprüft
+OUTLIER_Z = 3.5                 # ab dieser Abweichung (in Std.-Abw.) wird nachgefragt
+
+# 🏅 ACHIEVEMENTS
+ACHIEVEMENTS_TAB = "Achievements"            # eigener Tab im Sheet (wird bei Bedarf angelegt)
+ACHIEVEMENT_STATE_TAB = "AchievementState"   # Engine-Stand als JSON in A1 (Resume nach Neustart)
+OVERTAKE_MIN_LEAD = timedelta(days=1)        # so lange muss der Überholte geführt haben
+
 # 🖼️ BILD KONFIGURATION
 IMG_FIRST  = "https://media.istockphoto.com/id/1007282190/vector/horse-power-flame.jpg?s=612x612&w=0&k=20&c=uHnnvMTzaatfPblbFHdfhuJT7qLwsARF90oqH0dMCjA="
 IMG_MIDDLE = "https://t3.ftcdn.net/jpg/02/11/11/34/360_F_211113432_Gb89carZwwGuJA6lmux3NBU9tes3efMk.jpg"
@@ -20,7 +51,7 @@ IMG_LAST   = "https://i.etsystatic.com/28959621/r/il/e2cf08/5908874106/il_570xN.
 st.set_page_config(page_title="Fitness Derby", page_icon="🐎", layout="centered")
 
 # --- PROFI DESIGN CSS ---
-st.markdown("""
+APP_CSS = """
 <style>
 /* Das Haupt-Stadion */
 .racetrack { 
@@ -183,6 +214,7 @@ st.markdown("""
 
 .player-info { display: flex; flex-direction: column; }
 .player-name { font-weight: bold; color: #333; }
+.achievement-badges { font-size: 12px; margin-left: 4px; cursor: default; }
 .forecast-date { font-size: 11px; color: #888; margin-top: 2px; }
 .score-display { font-size: 16px; font-weight: bold; color: #3e4a38; text-align: right; }
 .score-detail { font-size: 10px; color: #888; font-weight: normal; display: block; }
@@ -210,10 +242,40 @@ st.markdown("""
     text-decoration: none !important;
 }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+def inject_css():
+    # Streamlit baut die Seite bei jedem Rerun neu auf, daher muss der (statische) Block
+    # pro Lauf mitgesendet werden - er wird aber nur einmal als Konstante gebaut.
+    st.markdown(APP_CSS, unsafe_allow_html=True)
+
+# --- STARTUP TIMING ---
+_TIMINGS = {}
+
+def mark_timing(label):
+    _TIMINGS[label] = (time.perf_counter() - _RUN_START) * 1000
+
+def log_timings(outcome="done"):
+    # Vor st.stop() / st.rerun() aufrufen, damit auch abgebrochene Läufe gemessen werden
+    mark_timing("total")
+    mode = "cold" if _COLD_START else "warm"
+    parts = ", ".join(f"{label}: {ms:.0f} ms" for label, ms in _TIMINGS.items())
+    logger.info(f"Startup ({mode}, {outcome}) - {parts}")
+
+# --- LETZTER SNAPSHOT (PROZESSWEIT) ---
+@st.cache_resource(show_spinner=False)
+def get_snapshot_store():
+    # Geteilt über alle Sessions, damit auch neue Besucher sofort eine Rennbahn sehen
+    return {'track_html': None}
+
+inject_css()
 
 # --- VERBINDUNGS-FUNKTIONEN ---
+@st.cache_resource(show_spinner=False)
 def get_google_sheet_client():
+    import gspread
+    from google.oauth2.service_account import Credentials
+
     try:
         if "service_account" not in st.secrets:
             st.error("Secrets Error: The [service_account] section is missing from secrets.toml.")
@@ -238,8 +300,81 @@ def get_data(tab_index):
         st.error(f"❌ Error loading Tab Index {tab_index}: {e}")
         return pd.DataFrame()
 
+# --- DUPLIKAT-SCHUTZ ---
+@st.cache_resource(show_spinner=False)
+def get_submission_index():
+    # Prozessweiter Index der letzten Eintragungen (Einfügereihenfolge = Zeitreihenfolge)
+    return {'lock': threading.Lock(), 'entries': OrderedDict()}
+
+def find_submission(key):
+    """Gibt die Meldung eines erfolgreichen Eintrags mit gleichem key im Zeitfenster zurück."""
+    index = get_submission_index()
+    now = time.time()
+    with index['lock']:
+        entries = index['entries']
+        while entries:
+            oldest = next(iter(entries.values()))
+            if now - oldest['ts'] <= DUPLICATE_WINDOW_SECONDS:
+                break
+            entries.popitem(last=False)
+
+        existing = entries.get(key)
+        return existing['msg'] if existing is not None else None
+
+def record_submission(key, msg):
+    index = get_submission_index()
+    with index['lock']:
+        # Neu einfügen statt überschreiben, damit die Reihenfolge = Zeitreihenfolge bleibt
+        index['entries'].pop(key, None)
+        index['entries'][key] = {'ts': time.time(), 'msg': msg}
+
+# --- AUSREISSER-ERKENNUNG ---
+def build_player_stats(logs_df):
+    """Mittelwert/Std.-Abw. der letzten OUTLIER_WINDOW Einträge je (Name, Exercise)."""
+    if logs_df.empty or not {'Name', 'Amount', 'Exercise'}.issubset(logs_df.columns):
+        return {}
+
+    recent = logs_df.assign(Amount=pd.to_numeric(logs_df['Amount'], errors='coerce')).dropna(subset=['Amount'])
+    if 'Timestamp' in recent.columns:
+        recent = recent.sort_values('Timestamp', kind='stable')
+    recent = recent.groupby(['Name', 'Exercise']).tail(OUTLIER_WINDOW)
+    agg = recent.groupby(['Name', 'Exercise'])['Amount'].agg(['mean', 'std', 'count'])
+
+    return {key: (row['mean'], row['std'], int(row['count'])) for key, row in agg.iterrows()}
+
+def find_outliers(player_stats, name, amounts):
+    flagged = []
+    for ex, value in amounts.items():
+        if value <= 0 or (name, ex) not in player_stats:
+            continue
+        mean, std, count = player_stats[(name, ex)]
+        if count < OUTLIER_MIN_SAMPLES:
+            continue
+        # Untergrenze, damit sehr gleichmässige Historien nicht jede Abweichung melden
+        std = max(0 if math.isnan(std) else std, 0.25 * mean, 1.0)
+        if (value - mean) / std > OUTLIER_Z:
+            flagged.append(f"{value} {ex} (sonst Ø {mean:.0f})")
+    return flagged
+
 # --- BATCH UPDATE FUNKTION ---
-def update_batch_entry(name, input_pushups, input_pullups, input_dips):
+def update_batch_entry(name, input_pushups, input_pullups, input_dips, token=None, force=False):
+    # Rückgabe: (True, msg) geschrieben, (False, "") Fehler, (None, msg) Duplikat - nichts geschrieben
+    # Ohne Token (z.B. Skripte) wird wie bisher immer geschrieben
+    if token is None:
+        return write_batch_entry(name, input_pushups, input_pullups, input_dips)
+
+    key = (name, int(input_pushups), int(input_pullups), int(input_dips), token)
+    previous_msg = find_submission(key)
+    if previous_msg is not None and not force:
+        logger.info(f"Duplikat nicht geschrieben: {key[:4]}")
+        return None, previous_msg
+
+    success, msg = write_batch_entry(name, input_pushups, input_pullups, input_dips)
+    if success:
+        record_submission(key, msg)
+    return success, msg
+
+def write_batch_entry(name, input_pushups, input_pullups, input_dips):
     try:
         client = get_google_sheet_client()
         sheet = client.open_by_key(SHEET_ID)
@@ -335,13 +470,275 @@ def save_full_edits(edited_logs_df):
         totals_data = [final_df.columns.values.tolist()] + final_df.values.tolist()
         ws_totals.update(totals_data)
         
+        # Log-Historie hat sich geändert -> Achievements beim nächsten Lauf neu auswerten
+        reset_achievements()
+        
         return True
     except Exception as e:
         st.error(f"Fehler beim Speichern der Änderungen: {e}")
         return False
 
+# --- ACHIEVEMENTS ---
+# Jede Regel bekommt den gepflegten Zustand und den gerade verarbeiteten Log-Eintrag.
+# Regeln mit 'unique' kann nur ein Spieler insgesamt erreichen.
+def dips_this_week(state, e):
+    week, dips = state['weekly_dips'].get(e['name'], (None, 0))
+    return dips if week == e['week'] else 0
+
+def took_over_lead(state, e):
+    # Nur echte Führungswechsel: der bisherige Leader muss mindestens OVERTAKE_MIN_LEAD lang geführt haben
+    if state['leader'] != e['name'] or state['prev_leader'] in (None, e['name']):
+        return False
+    return e['ts'] - state['prev_leader_since'] >= OVERTAKE_MIN_LEAD
+
+ACHIEVEMENTS = [
+    {'id': 'first_5k', 'icon': '🥇', 'label': 'Erster über 5k', 'unique': True,
+     'check': lambda state, e: state['totals'][e['name']] >= 5000},
+    {'id': 'streak_7', 'icon': '🔥', 'label': '7 Tage in Folge', 'unique': False,
+     'check': lambda state, e: state['streaks'][e['name']][1] >= 7},
+    {'id': 'dips_500_week', 'icon': '💎', 'label': '500 Dips in einer Woche', 'unique': False,
+     'check': lambda state, e: dips_this_week(state, e) >= 500},
+    {'id': 'overtake', 'icon': '⚔️', 'label': 'Leader überholt', 'unique': False,
+     'check': took_over_lead},
+]
+ACHIEVEMENTS_BY_ID = {rule['id']: rule for rule in ACHIEVEMENTS}
+
+def new_achievement_state():
+    return {
+        'cursor': 0,            # Anzahl bereits verarbeiteter Log-Zeilen
+        'prefix_hash': None,    # Hash über die sortierten Zeilen bis cursor (erkennt Änderungen davor)
+        'prefix_hashes': [],    # kumulative Hashes je Zeile, nur im Speicher (erkennt veraltete Reads)
+        'totals': {},           # name -> Gesamtpunkte
+        'streaks': {},          # name -> (letzter Tag, Serie in Tagen)
+        'weekly_dips': {},      # name -> ((jahr, kw), Dips)
+        'leader': None,
+        'leader_since': None,
+        'prev_leader': None,
+        'prev_leader_since': None,
+        'badge_rows': [],       # [Timestamp, Name, badge_id] in Reihenfolge des Erreichens
+        'earned': set(),        # (name, badge_id)
+        'claimed': set(),       # vergebene 'unique' badge_ids
+        'badges': {},           # name -> [badge_id, ...]
+    }
+
+def achievement_state_to_json(state):
+    return json.dumps({
+        'cursor': state['cursor'],
+        'prefix_hash': state['prefix_hash'],
+        'totals': state['totals'],
+        'streaks': {n: [day.isoformat(), streak] for n, (day, streak) in state['streaks'].items()},
+        'weekly_dips': {n: [list(week), dips] for n, (week, dips) in state['weekly_dips'].items()},
+        'leader': state['leader'],
+        'leader_since': state['leader_since'].strftime("%Y-%m-%d %H:%M:%S") if state['leader_since'] else None,
+        'badge_rows': state['badge_rows'],
+    })
+
+def achievement_state_from_json(raw):
+    data = json.loads(raw)
+    state = new_achievement_state()
+    state.update({
+        'cursor': data['cursor'],
+        'prefix_hash': data['prefix_hash'],
+        'totals': data['totals'],
+        'streaks': {n: (datetime.strptime(day, "%Y-%m-%d").date(), streak) for n, (day, streak) in data['streaks'].items()},
+        'weekly_dips': {n: (tuple(week), dips) for n, (week, dips) in data['weekly_dips'].items()},
+        'leader': data['leader'],
+        'leader_since': datetime.strptime(data['leader_since'], "%Y-%m-%d %H:%M:%S") if data['leader_since'] else None,
+    })
+    for timestamp, name, badge_id in data['badge_rows']:
+        grant_badge(state, name, badge_id, timestamp)
+    return state
+
+@st.cache_resource(show_spinner=False)
+def get_achievement_engine():
+    # 'state' ist None, bis der gespeicherte Stand aus dem Sheet geladen wurde.
+    # 'version' zählt jede Änderung, damit nie ein älterer Stand einen neueren überschreibt.
+    return {'lock': threading.Lock(), 'save_lock': threading.Lock(), 'state': None,
+            'version': 0, 'saved_version': 0}
+
+def reset_achievements():
+    # Nach Admin-Edits: Aggregate UND Badges beim nächsten Lauf aus der Historie neu berechnen
+    engine = get_achievement_engine()
+    with engine['lock']:
+        if engine['state'] is not None:
+            engine['state'] = new_achievement_state()
+
+def known_player_badges():
+    engine = get_achievement_engine()
+    with engine['lock']:
+        state = engine['state']
+        return {name: list(ids) for name, ids in state['badges'].items()} if state else {}
+
+def get_sheet_tab(sheet, title, header=None, cols=3):
+    import gspread
+
+    try:
+        return sheet.worksheet(title)
+    except gspread.WorksheetNotFound:
+        ws = sheet.add_worksheet(title=title, rows=1000, cols=cols)
+        if header:
+            ws.append_row(header)
+        return ws
+
+def load_achievement_state():
+    try:
+        client = get_google_sheet_client()
+        raw = get_sheet_tab(client.open_by_key(SHEET_ID), ACHIEVEMENT_STATE_TAB, cols=1).acell('A1').value
+    except Exception as e:
+        st.error(f"❌ Error loading Achievements: {e}")
+        return None
+
+    try:
+        return achievement_state_from_json(raw) if raw else new_achievement_state()
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Achievement-Stand unlesbar, baue neu auf: {e}")
+        return new_achievement_state()
+
+def save_achievements(state_json, badge_rows):
+    # Der Stand ist massgebend; der Achievements-Tab ist nur seine lesbare Abbildung
+    try:
+        client = get_google_sheet_client()
+        sheet = client.open_by_key(SHEET_ID)
+        get_sheet_tab(sheet, ACHIEVEMENT_STATE_TAB, cols=1).update_acell('A1', state_json)
+        if badge_rows is not None:
+            ws = get_sheet_tab(sheet, ACHIEVEMENTS_TAB)
+            ws.clear()
+            ws.update([["Timestamp", "Name", "Badge"]] + badge_rows)
+        return True
+    except Exception as e:
+        st.error(f"Fehler beim Speichern der Achievements: {e}")
+        return False
+
+def grant_badge(state, name, badge_id, timestamp):
+    rule = ACHIEVEMENTS_BY_ID.get(badge_id)
+    if rule is None or not name or (name, badge_id) in state['earned']:
+        return False
+    state['earned'].add((name, badge_id))
+    if rule['unique']:
+        state['claimed'].add(badge_id)
+    state['badges'].setdefault(name, []).append(badge_id)
+    state['badge_rows'].append([timestamp, name, badge_id])
+    return True
+
+def apply_log_entry(state, entry):
+    name = entry['name']
+
+    totals = state['totals']
+    totals[name] = totals.get(name, 0) + entry['amount']
+
+    # Nur der gerade aktualisierte Spieler kann die Führung übernehmen
+    state['prev_leader'], state['prev_leader_since'] = state['leader'], state['leader_since']
+    if state['leader'] is None or (state['leader'] != name and totals[name] > totals.get(state['leader'], 0)):
+        state['leader'], state['leader_since'] = name, entry['ts']
+
+    last_day, streak = state['streaks'].get(name, (None, 0))
+    if last_day != entry['day']:
+        streak = streak + 1 if last_day == entry['day'] - timedelta(days=1) else 1
+        state['streaks'][name] = (entry['day'], streak)
+
+    if entry['exercise'] == "Dips":
+        state['weekly_dips'][name] = (entry['week'], dips_this_week(state, entry) + entry['amount'])
+
+def evaluate_achievements(state, entry):
+    earned = []
+    for rule in ACHIEVEMENTS:
+        if (entry['name'], rule['id']) in state['earned']:
+            continue
+        if rule['unique'] and rule['id'] in state['claimed']:
+            continue
+        timestamp = entry['ts'].strftime("%Y-%m-%d %H:%M:%S")
+        if rule['check'](state, entry) and grant_badge(state, entry['name'], rule['id'], timestamp):
+            earned.append({'Timestamp': timestamp, 'Name': entry['name'], 'Badge': rule['id']})
+    return earned
+
+def prefix_hashes(rows):
+    # Kumulativer, reihenfolgeabhängiger Hash je Zeile (uint64, läuft modulo 2**64 über)
+    keyed = rows[['Timestamp', 'Name', 'Amount', 'Exercise']].assign(Position=range(len(rows)))
+    return pd.util.hash_pandas_object(keyed, index=False).cumsum().astype(str).tolist()
+
+def update_achievements(logs_df):
+    """Verarbeitet nur Log-Zeilen, die seit dem letzten Lauf dazugekommen sind.
+
+    Gibt (neu verdiente Badges, badge_ids je Spieler) zurück. Ändert sich die Historie
+    vor dem Cursor, werden Aggregate und Badges komplett neu berechnet (ohne Toasts).
+    """
+    if logs_df.empty or not {'Timestamp', 'Name', 'Amount', 'Exercise'}.issubset(logs_df.columns):
+        return [], known_player_badges()
+
+    rows = logs_df.dropna(subset=['Timestamp']).sort_values('Timestamp', kind='stable')
+    rows = rows.assign(Amount=pd.to_numeric(rows['Amount'], errors='coerce').fillna(0).astype(int))
+    hashes = prefix_hashes(rows)
+    engine = get_achievement_engine()
+
+    # Gespeicherten Stand einmal pro Prozess laden - ohne Lock, damit andere Sessions weiterlaufen
+    if engine['state'] is None:
+        loaded = load_achievement_state()
+        if loaded is None:
+            return [], {}
+        with engine['lock']:
+            if engine['state'] is None:
+                engine['state'] = loaded
+
+    with engine['lock']:
+        state = engine['state']
+        cursor = state['cursor']
+        if cursor > len(rows):
+            known = state['prefix_hashes']
+            if hashes and len(known) >= len(rows) and known[len(rows) - 1] == hashes[-1]:
+                # Veralteter Read (andere Session hat inzwischen neue Zeilen verarbeitet) -> nichts tun
+                return [], {name: list(ids) for name, ids in state['badges'].items()}
+            state = engine['state'] = new_achievement_state()
+        elif cursor and hashes[cursor - 1] != state['prefix_hash']:
+            # Zeilen vor dem Cursor wurden geändert/gelöscht/eingefügt -> alles neu berechnen
+            state = engine['state'] = new_achievement_state()
+        # Kompletter Durchlauf: kein gespeicherter Stand, Admin-Edit oder geänderte Historie
+        replay = state['cursor'] == 0
+
+        new_rows = rows.iloc[state['cursor']:]
+        new_badges = []
+        for ts, name, amount, exercise in zip(new_rows['Timestamp'], new_rows['Name'], new_rows['Amount'], new_rows['Exercise']):
+            entry = {
+                'ts': ts, 'day': ts.date(), 'week': tuple(ts.isocalendar()[:2]),
+                'name': name, 'amount': int(amount), 'exercise': exercise,
+            }
+            apply_log_entry(state, entry)
+            new_badges += evaluate_achievements(state, entry)
+
+        changed = state['cursor'] != len(rows) or replay
+        state['cursor'] = len(rows)
+        state['prefix_hash'] = hashes[-1] if hashes else None
+        state['prefix_hashes'] = hashes
+        player_badges = {name: list(ids) for name, ids in state['badges'].items()}
+        if changed:
+            engine['version'] += 1
+            version = engine['version']
+            state_json = achievement_state_to_json(state)
+            badge_rows = [list(row) for row in state['badge_rows']] if (new_badges or replay) else None
+
+    # Sheet-Zugriffe ausserhalb des Engine-Locks; save_lock hält nur Schreiber in Reihenfolge
+    if changed:
+        with engine['save_lock']:
+            if version > engine['saved_version']:
+                if save_achievements(state_json, badge_rows):
+                    engine['saved_version'] = version
+                else:
+                    # Beim nächsten Lauf vom gespeicherten Stand neu laden
+                    with engine['lock']:
+                        engine['state'] = None
+                    return [], player_badges
+
+    # Beim kompletten Durchlauf sind die Badges alt -> gespeichert, aber ohne Toast
+    return ([] if replay else new_badges), player_badges
+
+def render_badges_html(badge_ids):
+    if not badge_ids:
+        return ""
+    icons = "".join(ACHIEVEMENTS_BY_ID[b]['icon'] for b in badge_ids)
+    labels = ", ".join(ACHIEVEMENTS_BY_ID[b]['label'] for b in badge_ids)
+    return f'<span class="achievement-badges" title="{labels}">{icons}</span>'
+
 # --- RENDER FUNKTION ---
-def render_track_html(current_df, display_date=None):
+def render_track_html(current_df, display_date=None, badges=None):
     if current_df.empty: return ""
     
     # RENNBAHN ZEIGT IMMER TOTAL
@@ -417,7 +814,7 @@ def render_track_html(current_df, display_date=None):
 <div class="lane-divider" style="bottom: 0; border-bottom-style: {bottom_style}; border-bottom-color: {bottom_color};"></div>
 <div class="horse-container" style="left: {final_pos_percent}%;">
 <img src="{current_icon}" class="race-img">
-<span class="name-tag">{name} ({int(raw_score)})</span>
+<span class="name-tag">{name} ({int(raw_score)}){render_badges_html((badges or {}).get(name))}</span>
 </div>
 </div>
 """
@@ -435,21 +832,27 @@ skip_btn_placeholder = st.empty()
 if 'has_animated' not in st.session_state:
     st.session_state.has_animated = False
 
-# --- LOAD DATA ---
+# Letzten Stand sofort zeigen (eigene Session, sonst prozessweit), frische Daten kommen danach
+track_snapshot = st.session_state.get('track_snapshot') or get_snapshot_store()['track_html']
+if track_snapshot:
+    race_placeholder.markdown(track_snapshot, unsafe_allow_html=True)
+mark_timing("first_paint")
+
+import pandas as pd  # bewusst spät importiert (Cold Start)
+
+today_str = datetime.now().strftime('%d.%m.%Y')
+
+# --- LOAD DATA (TOTALS) ---
 df_totals = get_data(0)
-df_logs = get_data(1)
 
 if df_totals.empty:
     st.warning("Warte auf Daten (oder DB Verbindung prüfen)...")
+    log_timings("stop")
     st.stop()
 
 # --- DATEN VORBEREITUNG (REINIGUNG + GLOBAL CONVERSION) ---
 df_display = df_totals.copy()
 
-# 🔴 FIX: Sofortige Konvertierung der Timestamp-Spalte
-if not df_logs.empty and 'Timestamp' in df_logs.columns:
-    df_logs['Timestamp'] = pd.to_datetime(df_logs['Timestamp'], errors='coerce')
-
 # Daten für Display bereinigen (Strings zu Zahlen)
 for ex in EXERCISES:
     if ex not in df_display.columns:
@@ -465,6 +868,25 @@ else:
 # ScoreTotal wird ÜBERALL genutzt (Rennbahn, Stats)
 df_display['ScoreTotal'] = df_display['Total']
 
+# Ohne Animation kann die Rennbahn schon vor dem Log-Download aktualisiert werden
+if st.session_state.has_animated:
+    race_placeholder.markdown(render_track_html(df_display, today_str, known_player_badges()), unsafe_allow_html=True)
+mark_timing("totals")
+
+# --- LOAD DATA (LOGS) ---
+df_logs = get_data(1)
+
+# 🔴 FIX: Sofortige Konvertierung der Timestamp-Spalte
+if not df_logs.empty and 'Timestamp' in df_logs.columns:
+    df_logs['Timestamp'] = pd.to_datetime(df_logs['Timestamp'], errors='coerce')
+
+
+new_badges, player_badges = update_achievements(df_logs)
+for badge in new_badges:
+    rule = ACHIEVEMENTS_BY_ID[badge['Badge']]
+    st.toast(f"{rule['icon']} {badge['Name']}: {rule['label']}!")
+mark_timing("logs")
+
 # --- SUCCESS & SHARE LOGIC ---
 if 'last_log' in st.session_state:
     log_data = st.session_state.last_log
@@ -497,6 +919,7 @@ if not st.session_state.has_animated and not df_logs.empty:
     with skip_btn_placeholder:
         if st.button("⏩ Animation überspringen"):
             st.session_state.has_animated = True
+            log_timings("rerun")
             st.rerun()
 
     all_names = ["Kevin", "Sämi", "Eric", "Elia"]
@@ -548,10 +971,33 @@ if not st.session_state.has_animated and not df_logs.empty:
 skip_btn_placeholder.empty()
 
 # --- FINAL STATE ---
-today_str = datetime.now().strftime('%d.%m.%Y')
-race_placeholder.markdown(render_track_html(df_display, today_str), unsafe_allow_html=True)
+final_track_html = render_track_html(df_display, today_str, player_badges)
+race_placeholder.markdown(final_track_html, unsafe_allow_html=True)
+st.session_state.track_snapshot = final_track_html
+get_snapshot_store()['track_html'] = final_track_html
+mark_timing("track")
 
 # --- EINGABE FORMULAR (MULTI) ---
+# Ein Token pro Formular-Instanz (= Session). Dieselbe Eingabe innerhalb von
+# DUPLICATE_WINDOW_SECONDS gilt als Duplikat und muss bestätigt werden.
+if 'submit_token' not in st.session_state:
+    st.session_state.submit_token = uuid.uuid4().hex
+
+def submit_entry(who, in_push, in_pull, in_dips, force=False):
+    with st.spinner("Speichere..."):
+        success, msg = update_batch_entry(who, in_push, in_pull, in_dips, st.session_state.submit_token, force)
+        if success is None:
+            st.session_state.pending_entry = {
+                'name': who,
+                'amounts': {"Pushups": in_push, "Pullups": in_pull, "Dips": in_dips},
+                'warning': f"ℹ️ {msg} für {who} wurde gerade bereits eingetragen. Nochmals eintragen?",
+                'force': True,
+            }
+        elif success:
+            st.session_state.last_log = {'name': who, 'msg': msg}
+            log_timings("rerun")
+            st.rerun()
+
 with st.form("log_form", clear_on_submit=True):
     names_list = ["Kevin", "Sämi", "Eric", "Elia"]
     who = st.selectbox("Wer bist du?", names_list)
@@ -571,11 +1017,34 @@ with st.form("log_form", clear_on_submit=True):
         if in_push == 0 and in_pull == 0 and in_dips == 0:
             st.error("Bitte mindestens eine Übung eintragen.")
         else:
-            with st.spinner("Speichere..."):
-                success, msg = update_batch_entry(who, in_push, in_pull, in_dips)
-                if success:
-                    st.session_state.last_log = {'name': who, 'msg': msg}
-                    st.rerun()
+            amounts = {"Pushups": in_push, "Pullups": in_pull, "Dips": in_dips}
+            # Nur beim Absenden nötig -> normale Reruns sparen sich das groupby
+            outliers = find_outliers(build_player_stats(df_logs), who, amounts)
+            if outliers:
+                st.session_state.pending_entry = {
+                    'name': who,
+                    'amounts': amounts,
+                    'warning': f"⚠️ Ungewöhnlich hohe Werte für {who}: {', '.join(outliers)}. Wirklich eintragen?",
+                    'force': False,
+                }
+            else:
+                submit_entry(who, in_push, in_pull, in_dips)
+
+# --- BESTÄTIGUNG BEI AUSREISSERN / DUPLIKATEN ---
+if 'pending_entry' in st.session_state:
+    pending = st.session_state.pending_entry
+    st.warning(pending['warning'])
+    cc1, cc2 = st.columns(2)
+    with cc1:
+        if st.button("✅ Ja, eintragen", use_container_width=True):
+            del st.session_state.pending_entry
+            amounts = pending['amounts']
+            submit_entry(pending['name'], amounts["Pushups"], amounts["Pullups"], amounts["Dips"], pending['force'])
+    with cc2:
+        if st.button("✖️ Verwerfen", use_container_width=True):
+            del st.session_state.pending_entry
+            log_timings("rerun")
+            st.rerun()
 
 # --- FILTER UI (NUR FÜR LEADERBOARD) - JETZT HIER UNTEN ---
 st.divider()
@@ -644,7 +1113,7 @@ with col1:
 <div style="display:flex; align-items:center;">
 <span class="rank-badge">{rank}</span>
 <div class="player-info">
-<span class="player-name">{name}</span>
+<span class="player-name">{name}{render_badges_html(player_badges.get(name))}</span>
 <span class="forecast-date">Ø {daily_avg:.1f}/Tag {('• ' + forecast_str) if forecast_str else ''}</span>
 </div>
 </div>
@@ -702,8 +1171,11 @@ with st.expander("📝 Protokoll bearbeiten / Fehler korrigieren"):
                 if save_full_edits(edited_df):
                     st.success("Erfolgreich gespeichert! Seite wird neu geladen.")
                     time.sleep(1)
+                    log_timings("rerun")
                     st.rerun()
     else:
         st.info("Noch keine Einträge vorhanden.")
 
 st.caption("Data is live-synced with Google Sheets via gspread.")
+
+log_timings()